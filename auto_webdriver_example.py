@@ -5,29 +5,124 @@ This makes it easier to get started without having to manually install ChromeDri
 
 from yandex_images_crawler.download import download
 from pathlib import Path
+from urllib.parse import quote_plus
+import functools
+import importlib
+import importlib.util
+import json
 import os
+import platform
+import re
 import time
 import subprocess
 import sys
 
-# First, ensure webdriver-manager is installed
-try:
-    import webdriver_manager
-except ImportError:
+from image_files import count_files, image_count_target, list_basenames
+
+# First, ensure webdriver-manager is installed (without importing it yet)
+if importlib.util.find_spec("webdriver_manager") is None:
     print("Installing webdriver-manager...")
     subprocess.check_call([sys.executable, "-m", "pip", "install", "webdriver-manager"])
+    importlib.invalidate_caches()
+
+# Resolved ChromeDriver path, reused across runs while Chrome stays on the same major version
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "yandex_images_crawler")
+DRIVER_CACHE_FILE = os.path.join(CACHE_DIR, "driver.json")
+
+@functools.lru_cache(maxsize=1)
+def _chrome_major_version():
+    """Return the major version of the installed Chrome as a string, or None if unknown."""
+    system = platform.system()
+    version = None
+    
+    if system == "Windows":
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Google\Chrome\BLBeacon") as key:
+                version = winreg.QueryValueEx(key, "version")[0]
+        except OSError:
+            return None
+    else:
+        if system == "Darwin":  # macOS
+            binaries = ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"]
+        else:
+            binaries = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"]
+        for binary in binaries:
+            try:
+                version = subprocess.check_output(
+                    [binary, "--version"], stderr=subprocess.DEVNULL, universal_newlines=True
+                )
+                break
+            except (OSError, subprocess.CalledProcessError):
+                pass
+    
+    match = re.search(r"(\d+)\.", version or "")
+    return match.group(1) if match else None
+
+@functools.lru_cache(maxsize=1)
+def _chrome_driver_manager():
+    """Return the ChromeDriverManager class, importing webdriver-manager on first use."""
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager
 
-# Now we can safely import and use it
-from selenium import webdriver
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+def _webdriver_manager_version():
+    """Return the installed webdriver-manager version, or None if it can't be determined."""
+    try:
+        from importlib.metadata import version
+        return version("webdriver-manager")
+    except Exception:
+        return None
+
+def _resolve_chrome_driver():
+    """
+    Return the ChromeDriver path, calling ChromeDriverManager().install() only on a cache miss.
+    
+    The cache is keyed by the Chrome major version and the webdriver-manager version,
+    and is ignored if the cached binary was removed or replaced since it was recorded.
+    """
+    chrome_major = _chrome_major_version()
+    wdm_version = _webdriver_manager_version()
+    
+    if chrome_major is not None:
+        try:
+            with open(DRIVER_CACHE_FILE) as f:
+                cache = json.load(f)
+            path = cache["path"]
+            if (
+                cache["chrome_major"] == chrome_major
+                and cache["wdm_version"] == wdm_version
+                and os.path.exists(path)
+                and os.path.getmtime(path) == cache["mtime"]
+            ):
+                return path
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    
+    # This will download the appropriate ChromeDriver version if needed
+    ChromeDriverManager = _chrome_driver_manager()
+    path = ChromeDriverManager().install()
+    
+    if chrome_major is not None:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(DRIVER_CACHE_FILE, "w") as f:
+                json.dump({
+                    "chrome_major": chrome_major,
+                    "wdm_version": wdm_version,
+                    "path": path,
+                    "mtime": os.path.getmtime(path),
+                }, f)
+        except OSError:
+            pass
+    
+    return path
 
 def download_with_auto_webdriver(
     search_term: str,
     count: int = 10,
     min_size: tuple = (0, 0),
     output_dir: str = "downloaded_images",
-    headless: bool = False
+    headless: bool = True
 ):
     """
     Download images from Yandex search using automatic ChromeDriver management.
@@ -41,20 +136,10 @@ def download_with_auto_webdriver(
     """
     # Create the search URL if a simple search term was provided
     if not search_term.startswith("http"):
-        search_url = f"https://yandex.com/images/search?text={search_term.replace(' ', '%20')}"
+        search_url = f"https://yandex.com/images/search?text={quote_plus(search_term)}"
     else:
         search_url = search_term
     
-    # Create output directory
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    
-    # Get list of existing files to skip
-    skip_files = set()
-    for _, _, files in os.walk(output_path):
-        skip_files.update([file.split(".")[0] for file in files])
-        break
-    
     print(f"Starting download of {count} images of '{search_term}'")
     print(f"Images will be saved to: {output_dir}")
     print(f"Minimum image size: {min_size[0]}x{min_size[1]}")
@@ -65,12 +150,19 @@ def download_with_auto_webdriver(
     print()
     
     try:
-        # Install ChromeDriver using webdriver-manager
+        # Install ChromeDriver using webdriver-manager (or reuse the cached path)
         print("Setting up ChromeDriver...")
-        # This will download the appropriate ChromeDriver version if needed
-        chrome_driver_path = ChromeDriverManager().install()
+        chrome_driver_path = _resolve_chrome_driver()
         print(f"ChromeDriver installed at: {chrome_driver_path}")
         
+        # Create output directory, once there is a driver to fill it with
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        # Get list of existing files to skip
+        skip_files = list_basenames(output_path)
+        existing_files = count_files(output_path)
+        
         # Start the download
         start_time = time.time()
         
@@ -80,9 +172,9 @@ def download_with_auto_webdriver(
         download(
             links=[search_url],
             image_size=min_size,
-            image_count=count,
+            image_count=image_count_target(count, existing_files),
             image_dir=output_path,
-            skip_files=frozenset(skip_files),
+            skip_files=skip_files,
             loaders_per_link=2,
             headless_mode=headless
         )
@@ -90,10 +182,7 @@ def download_with_auto_webdriver(
         elapsed_time = time.time() - start_time
         
         # Count the number of downloaded images
-        new_files = 0
-        for _, _, files in os.walk(output_path):
-            new_files = len(files) - len(skip_files)
-            break
+        new_files = count_files(output_path) - existing_files
         
         print(f"\nDownload complete! Downloaded {new_files} new images in {elapsed_time:.1f} seconds.")
         print(f"Images are saved in the '{output_dir}' directory.")
@@ -113,7 +202,7 @@ if __name__ == "__main__":
     parser.add_argument("--width", type=int, default=800, help="Minimum image width")
     parser.add_argument("--height", type=int, default=600, help="Minimum image height")
     parser.add_argument("--dir", type=str, default="downloaded_images", help="Output directory")
-    parser.add_argument("--headless", action="store_true", help="Run in headless mode")
+    parser.add_argument("--show-browser", action="store_true", help="Show the browser window instead of running headless")
     
     args = parser.parse_args()
     
@@ -122,5 +211,5 @@ if __name__ == "__main__":
         count=args.count,
         min_size=(args.width, args.height),
         output_dir=args.dir,
-        headless=args.headless
+        headless=not args.show_browser
     )
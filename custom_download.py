@@ -5,9 +5,11 @@ Edit the configuration variables below to customize your download.
 
 from yandex_images_crawler.download import download
 from pathlib import Path
-import os
+from urllib.parse import quote_plus
 import time
 
+from image_files import count_files, image_count_target, list_basenames
+
 # ======= CONFIGURATION - EDIT THESE VALUES =======
 
 # Search term or full Yandex search URL
@@ -41,17 +43,15 @@ def main():
     # Create the search URL if a simple search term was provided
     search_url = SEARCH
     if not search_url.startswith("http"):
-        search_url = f"https://yandex.com/images/search?text={SEARCH.replace(' ', '%20')}"
+        search_url = f"https://yandex.com/images/search?text={quote_plus(SEARCH)}"
     
     # Create output directory
     output_path = Path(OUTPUT_DIRECTORY)
     output_path.mkdir(parents=True, exist_ok=True)
     
     # Get list of existing files to skip
-    skip_files = set()
-    for _, _, files in os.walk(output_path):
-        skip_files.update([file.split(".")[0] for file in files])
-        break
+    skip_files = list_basenames(output_path)
+    existing_files = count_files(output_path)
     
     print(f"Starting download of {NUMBER_OF_IMAGES if NUMBER_OF_IMAGES > 0 else 'unlimited'} images")
     print(f"Search: {SEARCH}")
@@ -69,9 +69,9 @@ def main():
         download(
             links=[search_url],
             image_size=(MIN_WIDTH, MIN_HEIGHT),
-            image_count=NUMBER_OF_IMAGES,
+            image_count=image_count_target(NUMBER_OF_IMAGES, existing_files),
             image_dir=output_path,
-            skip_files=frozenset(skip_files),
+            skip_files=skip_files,
             loaders_per_link=LOADERS_PER_LINK,
             headless_mode=HEADLESS_MODE
         )
@@ -79,10 +79,7 @@ def main():
         elapsed_time = time.time() - start_time
         
         # Count the number of downloaded images
-        new_files = 0
-        for _, _, files in os.walk(output_path):
-            new_files = len(files) - len(skip_files)
-            break
+        new_files = count_files(output_path) - existing_files
         
         print(f"\nDownload complete! Downloaded {new_files} new images in {elapsed_time:.1f} seconds.")
         print(f"Images are saved in the '{OUTPUT_DIRECTORY}' directory.")
@@ -1,61 +1,433 @@
 """
 Example script demonstrating how to use the Yandex Images Crawler directly
 in Python code (not just as a command-line tool).
+
+Selenium is only used to collect image links from the search results page.
+The images themselves are then fetched concurrently with asyncio and aiohttp
+over a single connection pool, instead of one loader process per link.
 """
 
-from yandex_images_crawler.download import download
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import unquote
+import asyncio
+import hashlib
+import html as html_lib
 import os
+import re
+import tempfile
+import time
+
+import aiohttp
+from PIL import Image
+from selenium import webdriver
+
+from image_files import list_basenames
+
+try:
+    import orjson as json
+except ImportError:
+    import json
+
+# Size of the chunks read from each response and written to disk
+CHUNK_SIZE = 256 * 1024
+
+# Most chunks gathered into one vectored write; larger batches only add latency
+WRITE_BATCH = 32
+
+# Links to the original images are carried in the img_url parameter of the result anchors
+IMG_URL_RE = re.compile(r"img_url=([^&\"']+)")
+
+# Each result also carries its metadata as JSON in a data-bem attribute
+DATA_BEM_RE = re.compile(r'data-bem="([^"]+)"')
+
+# Up to this many images, links are first looked for in the plain HTML of the results
+FAST_MODE_MAX_COUNT = 50
+
+# File in the output directory holding the hashes of every URL an image was saved from
+URL_HASHES_FILE = ".url_hashes"
+URL_HASH_SIZE = 16
+
+# Extensions for the image formats whose lowercased PIL name isn't the usual one;
+# PIL reports many phone photos as MPO, which are JPEG files
+EXTENSIONS = {"JPEG": "jpg", "MPO": "jpg"}
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0",
+    "Referer": "https://yandex.com/",
+}
+
+def _extract_image_urls(html):
+    """Return the original image URLs found in a results page, in page order and without repeats."""
+    return list(dict.fromkeys(unquote(match) for match in IMG_URL_RE.findall(html)))
+
+def _extract_image_urls_json(html):
+    """
+    Return the original image URLs from the serp-item JSON of a results page.
+    
+    Falls back to the img_url links when the page carries no such JSON.
+    """
+    urls = []
+    for match in DATA_BEM_RE.finditer(html):
+        try:
+            data = json.loads(html_lib.unescape(match.group(1)))
+        except ValueError:
+            continue
+        item = data.get("serp-item") if isinstance(data, dict) else None
+        url = item.get("img_href") if isinstance(item, dict) else None
+        if url and isinstance(url, str):
+            urls.append(url)
+    if not urls:
+        return _extract_image_urls(html)
+    return list(dict.fromkeys(urls))
+
+# Ways of pulling image URLs out of a results page, selected with download_images(parser=...)
+PARSERS = {
+    "regex": _extract_image_urls,
+    "json": _extract_image_urls_json,
+}
+
+def _url_hash(url):
+    return hashlib.blake2b(url.encode(), digest_size=URL_HASH_SIZE).digest()
+
+def _load_url_hashes(output_path):
+    """Return the hashes of the URLs previous runs saved images into ``output_path`` from."""
+    try:
+        data = (output_path / URL_HASHES_FILE).read_bytes()
+    except FileNotFoundError:
+        return set()
+    return {data[i:i + URL_HASH_SIZE] for i in range(0, len(data), URL_HASH_SIZE)}
+
+def _unseen_urls(urls, seen):
+    """Return ``urls`` without the ones whose hash is in ``seen``."""
+    return [url for url in urls if _url_hash(url) not in seen]
+
+def _write_all(fd, chunks):
+    """Write ``chunks`` to ``fd``, one vectored write for all of them where supported."""
+    views = [memoryview(chunk) for chunk in chunks]
+    while views:
+        if hasattr(os, "writev"):
+            written = os.writev(fd, views)
+        else:
+            written = os.write(fd, views[0])
+        # Drop what was written, which may end partway through a chunk
+        while views and written >= len(views[0]):
+            written -= len(views.pop(0))
+        if written:
+            views[0] = views[0][written:]
+
+def _preallocate(fd, size):
+    """Reserve ``size`` bytes for the file behind ``fd`` so it is written contiguously."""
+    try:
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(fd, 0, size)
+        elif os.name == "nt":
+            # Extending the file sets its end (SetEndOfFile), which allocates on NTFS
+            os.ftruncate(fd, size)
+    except OSError:
+        pass  # Not supported by this filesystem; the file just grows as it's written
+
+def _chrome_options(headless):
+    """
+    Return Chrome options for collecting links.
+    
+    Only the anchors of the results page are needed, so the browser is told
+    not to load any images.
+    """
+    options = webdriver.ChromeOptions()
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--incognito")
+    if headless:
+        options.add_argument("--headless")
+    return options
+
+def _harvest_links(
+    search_url, count, options, max_scrolls=20, extract=_extract_image_urls, seen=frozenset()
+):
+    """
+    Scroll the search results with Selenium and return the image URLs found.
+    
+    URLs whose hash is in ``seen`` are left out. Scrolling stops once ``count``
+    such new links are collected (never, for 0) or the page stops growing.
+    """
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.get(search_url)
+        
+        found = 0
+        for _ in range(max_scrolls):
+            # Only parse the page once it has enough links in all to possibly hold enough new ones
+            if count > 0 and found >= count:
+                urls = _unseen_urls(extract(driver.page_source), seen)
+                if len(urls) >= count:
+                    return urls
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            time.sleep(1)  # Wait for the next batch of results to load
+            
+            # Count links in the browser; the page source is only fetched once there are enough
+            new_found = driver.execute_script(
+                "return document.querySelectorAll(\"a[href*='img_url=']\").length;"
+            )
+            if new_found == found:
+                break
+            found = new_found
+        
+        return _unseen_urls(extract(driver.page_source), seen)
+    finally:
+        driver.quit()
+
+def harvest_urls(
+    search_urls, options, per_link_scrolls=20, count=0, extract=_extract_image_urls, seen=frozenset()
+):
+    """
+    Collect image URLs from several search pages at once, one browser per page.
+    
+    The browsers spend most of their time waiting on the network, so they run
+    in threads. ``count`` is the total number of new links wanted (0 for as many
+    as the pages give), leaving out URLs whose hash is in ``seen``; the result
+    has no repeats across pages.
+    """
+    per_link_count = -(-count // len(search_urls))  # Round up
+    
+    def _scroll_one(search_url):
+        return _harvest_links(search_url, per_link_count, options, per_link_scrolls, extract, seen)
+    
+    with ThreadPoolExecutor(max_workers=len(search_urls)) as executor:
+        results = list(executor.map(_scroll_one, search_urls))
+    
+    return list(dict.fromkeys(url for urls in results for url in urls))
+
+async def _harvest_http(
+    session, search_urls, count, max_pages=3, extract=_extract_image_urls, seen=frozenset()
+):
+    """
+    Collect image URLs from the plain HTML of the results pages, without a browser.
+    
+    URLs whose hash is in ``seen`` are left out. Stops early, returning what was
+    found so far, once ``count`` new links are collected or Yandex answers with
+    a CAPTCHA instead of results.
+    """
+    urls = []
+    for page in range(max_pages):
+        for search_url in search_urls:
+            if page > 0:
+                search_url += ("&" if "?" in search_url else "?") + f"p={page}"
+            try:
+                async with session.get(search_url) as response:
+                    if not 200 <= response.status < 300 or "captcha" in response.url.path:
+                        return urls
+                    html = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return urls
+            
+            urls = list(dict.fromkeys(urls + _unseen_urls(extract(html), seen)))
+            if len(urls) >= count:
+                return urls
+    return urls
+
+async def _fetch(session, url, sem, output_path, min_size, skip_files, saved_names, preallocate):
+    """Download one image into ``output_path``. Returns True if a new image was saved."""
+    async with sem:
+        # Stream into a hidden temporary file, named after the content hash once complete
+        fd, part_path = tempfile.mkstemp(prefix=".", suffix=".part", dir=output_path)
+        try:
+            digest = hashlib.sha256()
+            with open(fd, "wb", buffering=0) as f:
+                async with session.get(url) as response:
+                    if not 200 <= response.status < 300:
+                        return False
+                    # Content-Length is the encoded size when the body is compressed
+                    size = response.content_length
+                    if preallocate and size and "Content-Encoding" not in response.headers:
+                        _preallocate(fd, size)
+                    # Gather the chunks and write them out together, without copying them
+                    batch, batch_size = [], 0
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        digest.update(chunk)
+                        batch.append(chunk)
+                        batch_size += len(chunk)
+                        if batch_size >= CHUNK_SIZE or len(batch) >= WRITE_BATCH:
+                            _write_all(fd, batch)
+                            batch, batch_size = [], 0
+                    _write_all(fd, batch)
+                    # Drop any reserved space past the end, should the body be shorter
+                    f.truncate()
+            
+            # Only the image header is read here
+            with Image.open(part_path) as img:
+                width, height = img.size
+                image_format = img.format
+            
+            hash_name = digest.hexdigest()
+            if (
+                width < min_size[0]
+                or height < min_size[1]
+                or hash_name in skip_files
+                or hash_name in saved_names
+            ):
+                return False
+            
+            extension = EXTENSIONS.get(image_format) or image_format.lower()
+            os.replace(part_path, output_path / f"{hash_name}.{extension}")
+            saved_names.add(hash_name)
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            return False
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+async def _download_all(session, urls, output_path, count, min_size, skip_files, concurrency, preallocate):
+    """
+    Download ``urls`` concurrently until ``count`` images are saved (all of them for 0).
+    
+    Returns the number of images saved and the URLs they were saved from.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    saved_names = set()
+    
+    tasks = [
+        asyncio.ensure_future(_fetch(
+            session, url, sem, output_path, min_size, skip_files, saved_names, preallocate
+        ))
+        for url in urls
+    ]
+    saved = 0
+    try:
+        for task in asyncio.as_completed(tasks):
+            # Any error from one image (e.g. PIL's DecompressionBombError) only loses that image
+            try:
+                ok = await task
+            except Exception:
+                ok = False
+            if ok:
+                saved += 1
+                if count > 0 and saved >= count:
+                    break
+    finally:
+        # Cancel the remaining downloads and let them remove their temporary files
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # Failed, too small or duplicate downloads are left out, so a later run tries them again
+    saved_urls = [
+        url for url, task in zip(urls, tasks)
+        if not task.cancelled() and task.exception() is None and task.result()
+    ]
+    return saved, saved_urls
+
+async def _collect_and_download(
+    search_urls, output_path, count, min_size, concurrency, chrome_options, fast_mode, preallocate,
+    extract
+):
+    """
+    Collect image links and download them, sharing one HTTP session for both.
+    
+    The output directory is only created and scanned once some links were found.
+    """
+    connector = aiohttp.TCPConnector(limit_per_host=concurrency, ssl=False)
+    timeout = aiohttp.ClientTimeout(total=30)
+    
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=timeout) as session:
+        # Leave out the links previous runs already saved images from, while harvesting,
+        # so a repeated search keeps collecting until it has enough new ones
+        seen = _load_url_hashes(output_path)
+        
+        # Collect twice as many links as needed, since some will fail or be too small
+        urls = []
+        if fast_mode and 0 < count <= FAST_MODE_MAX_COUNT:
+            urls = await _harvest_http(session, search_urls, 2 * count, extract=extract, seen=seen)
+        if not urls or len(urls) < count:
+            # Fall back to scrolling the results in a browser, keeping the links already found
+            loop = asyncio.get_running_loop()
+            browser_urls = await loop.run_in_executor(
+                None, harvest_urls, search_urls, chrome_options, 20, 2 * count, extract, seen
+            )
+            urls = list(dict.fromkeys(urls + browser_urls))
+        
+        if not urls:
+            return 0, []
+        
+        # Create output directory if it doesn't exist
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        # Get list of existing files to skip
+        skip_files = list_basenames(output_path)
+        
+        # Download the images without any browser involved
+        return await _download_all(
+            session, urls, output_path, count, min_size, skip_files, concurrency, preallocate
+        )
 
 def download_images(
-    search_url: str,
+    search_url,
     count: int = 10,
     min_size: tuple = (0, 0),
     output_dir: str = "downloaded_images",
-    headless: bool = False
+    headless: bool = True,
+    concurrency: int = 8,
+    chrome_options=None,
+    fast_mode: bool = True,
+    preallocate: bool = True,
+    parser: str = "regex"
 ):
     """
-    Download images from Yandex search using the crawler directly.
+    Download images from Yandex search, collecting the links from the results
+    pages and fetching the images over HTTP.
     
     Args:
-        search_url: Yandex Images search URL
-        count: Number of images to download
+        search_url: Yandex Images search URL, or a list of them
+        count: Number of images to download (0 for every image found)
         min_size: Minimum image size as (width, height)
         output_dir: Directory to save downloaded images
         headless: Whether to run in headless mode
+        concurrency: Maximum number of images downloaded at the same time
+        chrome_options: ChromeOptions used to collect links (overrides headless);
+            by default images are not loaded in the browser
+        fast_mode: For small counts, look for links in the plain HTML of the
+            results first and only start a browser if that isn't enough
+        preallocate: Reserve disk space for each image up front when its size is known
+        parser: How image URLs are read from the results pages: "regex" for the
+            img_url links, or "json" for the serp-item data of each result
+    
+    Returns:
+        The number of new images saved
     """
-    # Create output directory if it doesn't exist
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown parser: {parser!r} (expected one of {', '.join(PARSERS)})")
+    
     output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    
-    # Get list of existing files to skip
-    skip_files = set()
-    for _, _, files in os.walk(output_path):
-        skip_files.update([file.split(".")[0] for file in files])
-        break
-    
-    # Convert skip_files to frozenset as required by the download function
-    skip_files_frozen = frozenset(skip_files)
-    
-    # Call the download function
-    download(
-        links=[search_url],  # List of search URLs
-        image_size=min_size,  # Minimum image size (width, height)
-        image_count=count,    # Number of images to download
-        image_dir=output_path,  # Output directory
-        skip_files=skip_files_frozen,  # Files to skip
-        loaders_per_link=1,   # Number of loader processes per link
-        headless_mode=headless  # Whether to run in headless mode
-    )
+    if chrome_options is None:
+        chrome_options = _chrome_options(headless)
+    search_urls = [search_url] if isinstance(search_url, str) else list(search_url)
+    
+    saved, saved_urls = asyncio.run(_collect_and_download(
+        search_urls, output_path, count, min_size, concurrency, chrome_options, fast_mode, preallocate,
+        PARSERS[parser]
+    ))
+    
+    if saved_urls:
+        with open(output_path / URL_HASHES_FILE, "ab") as f:
+            f.write(b"".join(_url_hash(url) for url in saved_urls))
+    
+    return saved
 
 if __name__ == "__main__":
     # Example 1: Download 5 cat images
     search_url = "https://yandex.com/images/search?text=cats"
-    download_images(
+    saved = download_images(
         search_url=search_url,
         count=5,
-        output_dir="cat_images"
+        output_dir="cat_images",
+        parser="json"
     )
+    print(f"Downloaded {saved} new images.")
     
     # Example 2: Download 10 landscape images with minimum size 1920x1080
     # Uncomment to run this example
@@ -66,6 +438,6 @@ if __name__ == "__main__":
         count=10,
         min_size=(1920, 1080),
         output_dir="landscape_images",
-        headless=True  # Run in headless mode
+        headless=False  # Show the browser window
     )
     """
@@ -5,9 +5,11 @@ Just run this script directly to download the images.
 
 from yandex_images_crawler.download import download
 from pathlib import Path
-import os
+from urllib.parse import quote_plus
 import time
 
+from image_files import count_files, image_count_target, list_basenames
+
 def main():
     # Configuration
     search_term = "cute cats"
@@ -17,17 +19,15 @@ def main():
     min_height = 600
     
     # Create the search URL
-    search_url = f"https://yandex.com/images/search?text={search_term.replace(' ', '%20')}"
+    search_url = f"https://yandex.com/images/search?text={quote_plus(search_term)}"
     
     # Create output directory
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
     # Get list of existing files to skip
-    skip_files = set()
-    for _, _, files in os.walk(output_path):
-        skip_files.update([file.split(".")[0] for file in files])
-        break
+    skip_files = list_basenames(output_path)
+    existing_files = count_files(output_path)
     
     print(f"Starting download of {num_images} images of '{search_term}'")
     print(f"Images will be saved to: {output_dir}")
@@ -43,9 +43,9 @@ def main():
         download(
             links=[search_url],
             image_size=(min_width, min_height),
-            image_count=num_images,
+            image_count=image_count_target(num_images, existing_files),
             image_dir=output_path,
-            skip_files=frozenset(skip_files),
+            skip_files=skip_files,
             loaders_per_link=2,  # Use 2 loaders for faster downloads
             headless_mode=False  # Set to True for headless mode
         )
@@ -53,10 +53,7 @@ def main():
         elapsed_time = time.time() - start_time
         
         # Count the number of downloaded images
-        new_files = 0
-        for _, _, files in os.walk(output_path):
-            new_files = len(files) - len(skip_files)
-            break
+        new_files = count_files(output_path) - existing_files
         
         print(f"\nDownload complete! Downloaded {new_files} new images in {elapsed_time:.1f} seconds.")
         print(f"Images are saved in the '{output_dir}' directory.")
@@ -4,8 +4,18 @@ to download a limited number of images from a Yandex search.
 """
 
 import argparse
-import subprocess
 import sys
+from pathlib import Path
+from urllib.parse import quote_plus
+
+from yandex_images_crawler.download import download
+
+from image_files import count_files, image_count_target, list_basenames
+
+def _parse_size(size):
+    """Parse a "WxH" string such as "800x600" into a (width, height) tuple."""
+    width, _, height = size.lower().partition("x")
+    return int(width), int(height)
 
 def main():
     parser = argparse.ArgumentParser(description="Download images from Yandex search")
@@ -46,28 +56,36 @@ def main():
         search_url = args.search
     else:
         # Create a Yandex search URL from the search term
-        search_term = args.search.replace(" ", "%20")
+        search_term = quote_plus(args.search)
         search_url = f"https://yandex.com/images/search?text={search_term}"
     
-    # Prepare the command to run the Yandex Images Crawler
-    cmd = [
-        "yandex-images-crawler",
-        "--links", search_url,
-        "--count", str(args.count),
-        "--size", args.size,
-        "--dir", args.dir
-    ]
+    try:
+        image_size = _parse_size(args.size)
+    except ValueError:
+        print(f"Invalid size format: {args.size}. Use WxH, e.g. 800x600.")
+        sys.exit(1)
     
-    if args.headless:
-        cmd.append("--headless")
+    # Create output directory and get list of existing files to skip
+    output_path = Path(args.dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    skip_files = list_basenames(output_path)
+    existing_files = count_files(output_path)
     
     print(f"Starting download of {args.count} images for search: {args.search}")
     print(f"Images will be saved to: {args.dir}")
     print(f"Minimum image size: {args.size}")
     
     try:
-        # Run the Yandex Images Crawler
-        subprocess.run(cmd)
+        # Run the Yandex Images Crawler in this process
+        download(
+            links=[search_url],
+            image_size=image_size,
+            image_count=image_count_target(args.count, existing_files),
+            image_dir=output_path,
+            skip_files=skip_files,
+            loaders_per_link=1,
+            headless_mode=args.headless
+        )
         print(f"\nDownload complete! Check the '{args.dir}' directory for your images.")
     except Exception as e:
         print(f"Error: {e}")
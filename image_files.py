@@ -0,0 +1,28 @@
+"""
+Helpers shared by the scripts for looking at the images already in an output directory.
+"""
+
+import os
+
+def list_basenames(path):
+    """Return the names of the files directly inside ``path``, without extensions."""
+    with os.scandir(path) as it:
+        return {
+            entry.name.rpartition(".")[0] or entry.name
+            for entry in it
+            if entry.is_file(follow_symlinks=False)
+        }
+
+def count_files(path):
+    """Return the number of files directly inside ``path``."""
+    with os.scandir(path) as it:
+        return sum(1 for entry in it if entry.is_file(follow_symlinks=False))
+
+def image_count_target(count, existing_files):
+    """
+    Return the image_count to pass to download() for ``count`` new images (0 for unlimited).
+    
+    download() stops once image_dir holds image_count files in all, so the
+    ``existing_files`` already there (see count_files) are added on top.
+    """
+    return count + existing_files if count > 0 else 0
@@ -3,12 +3,18 @@ Installation script for Yandex Images Crawler dependencies.
 This script checks for and installs the required dependencies.
 """
 
+import functools
 import subprocess
+import shutil
 import sys
 import os
 import platform
 import webbrowser
 
+# Marker recording that Chrome was found, so repeated setup runs skip the check
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "yandex_images_crawler")
+CHROME_OK_MARKER = os.path.join(CACHE_DIR, "chrome_ok")
+
 def check_python_version():
     """Check if Python version is 3.6 or higher."""
     version = sys.version_info
@@ -18,17 +24,37 @@ def check_python_version():
         return False
     return True
 
-def install_package(package):
-    """Install a Python package using pip."""
+def install_packages(packages):
+    """Install Python packages with a single pip call, preferring prebuilt wheels."""
+    packages = sorted(set(packages))
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "--upgrade", "--prefer-binary", *packages])
         return True
     except subprocess.CalledProcessError:
-        print(f"Error: Failed to install {package}.")
+        print(f"Error: Failed to install {', '.join(packages)}.")
         return False
 
+@functools.lru_cache(maxsize=1)
 def check_chrome_installed():
     """Check if Chrome is installed."""
+    if os.path.exists(CHROME_OK_MARKER):
+        return True
+    
+    if _find_chrome():
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            open(CHROME_OK_MARKER, "a").close()
+        except OSError:
+            pass
+        return True
+    
+    print("Chrome browser not found. Please install Chrome.")
+    print("Opening Chrome download page...")
+    webbrowser.open("https://www.google.com/chrome/")
+    return False
+
+def _find_chrome():
+    """Return True if a Chrome installation is found in the usual places."""
     system = platform.system()
     
     if system == "Windows":
@@ -43,15 +69,9 @@ def check_chrome_installed():
         if os.path.exists("/Applications/Google Chrome.app"):
             return True
     elif system == "Linux":
-        try:
-            subprocess.check_call(["which", "google-chrome"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if shutil.which("google-chrome") is not None:
             return True
-        except subprocess.CalledProcessError:
-            pass
     
-    print("Chrome browser not found. Please install Chrome.")
-    print("Opening Chrome download page...")
-    webbrowser.open("https://www.google.com/chrome/")
     return False
 
 def main():
@@ -72,20 +92,14 @@ def main():
     packages = [
         "yandex-images-crawler",
         "selenium",
-        "webdriver-manager"  # For automatic ChromeDriver management
+        "webdriver-manager",  # For automatic ChromeDriver management
+        "aiohttp"  # For concurrent downloads in direct_usage_example.py
     ]
     
-    for package in packages:
-        print(f"Installing {package}...")
-        if not install_package(package):
-            print(f"Failed to install {package}. Please install it manually.")
-            return
-    
-    print("\nInstalling webdriver-manager to automatically manage ChromeDriver...")
-    if not install_package("webdriver-manager"):
-        print("Failed to install webdriver-manager. You'll need to install ChromeDriver manually.")
-        print("Opening ChromeDriver download page...")
-        webbrowser.open("https://chromedriver.chromium.org/downloads")
+    print(f"Installing {', '.join(packages)}...")
+    if not install_packages(packages):
+        print("Failed to install the required packages. Please install them manually with:")
+        print(f"  pip install {' '.join(packages)}")
         return
     
     print("\nAll dependencies installed successfully!")
@@ -4,34 +4,50 @@ This script will automatically stop if too many errors occur in succession.
 """
 
 import argparse
+import contextlib
+import hashlib
+import importlib
+import importlib.util
+import io
 import logging
 import os
+import queue
+import random
+import shutil
 import signal
+import subprocess
 import sys
+import threading
 import time
-from multiprocessing import Process, Queue, Value
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Event, Process, Queue, Value, get_start_method
+from multiprocessing.connection import wait
 from pathlib import Path
+from urllib.parse import quote_plus
 
-# First, ensure webdriver-manager is installed
-try:
-    import webdriver_manager
-except ImportError:
-    print("Installing webdriver-manager...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "webdriver-manager"])
+from image_files import list_basenames
+
+def _ensure_installed(module, package):
+    """Install ``package`` with pip if ``module`` can't be found, without importing it."""
+    if importlib.util.find_spec(module) is None:
+        print(f"Installing {package}...")
+        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
+        importlib.invalidate_caches()
+
+# First, ensure webdriver-manager and the crawler are installed (without importing them yet)
+_ensure_installed("webdriver_manager", "webdriver-manager")
+_ensure_installed("yandex_images_crawler", "yandex-images-crawler")
 
 # Import the crawler components
-try:
-    from yandex_images_crawler.count_checker import CountChecker
-    from yandex_images_crawler.image_loader import ImageLoader
-    from yandex_images_crawler.yandex_crawler import YandexCrawler
-except ImportError:
-    print("Installing yandex-images-crawler...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "yandex-images-crawler"])
-    from yandex_images_crawler.count_checker import CountChecker
-    from yandex_images_crawler.image_loader import ImageLoader
-    from yandex_images_crawler.yandex_crawler import YandexCrawler
+from yandex_images_crawler.image_loader import ImageLoader
+from yandex_images_crawler.yandex_crawler import YandexCrawler
+
+# Installed alongside yandex-images-crawler
+import numpy as np
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Set up logging
 logging.basicConfig(
@@ -40,58 +56,405 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Global flag to track if we should exit
-should_exit = False
+# Buffer size for reading and writing images; most images fit in a single write() call
+WRITE_BUFSIZE = 256 * 1024
+
+# Crawlers send links to the loaders in batches of up to LINK_BATCH, or as
+# soon as the oldest buffered link has waited LINK_FLUSH_INTERVAL seconds
+LINK_BATCH = 16
+LINK_FLUSH_INTERVAL = 0.1
+
+# Seconds a crawler waits after an error, doubling with each consecutive error up to the maximum
+ERROR_BACKOFF = 1.0
+MAX_ERROR_BACKOFF = 30.0
+
+def _skip_keys(names):
+    """
+    Return the image hashes among ``names`` as a frozenset of ints.
+    
+    Images are saved under the hex SHA-256 of their pixels; as ints these hash
+    faster and take less memory than 64-character strings. Other names can
+    never match a new image and are left out.
+    """
+    keys = set()
+    for name in names:
+        if isinstance(name, int):
+            keys.add(name)
+        elif len(name) == 64:
+            try:
+                keys.add(int(name, 16))
+            except ValueError:
+                pass
+    return frozenset(keys)
+
+def _start_processes(processes):
+    """
+    Start ``processes``, in parallel when each start launches a fresh interpreter.
+    
+    Forking from several threads at once is unsafe, and cheap enough one at a
+    time anyway, so under the fork start method they are started in turn.
+    """
+    if get_start_method() == "fork" or len(processes) < 2:
+        for p in processes:
+            p.start()
+        return
+    
+    with ThreadPoolExecutor(max_workers=min(32, len(processes))) as executor:
+        list(executor.map(Process.start, processes))
+
+def _split_cpus(num_loaders):
+    """
+    Split the CPUs this process may run on between crawlers and loaders.
+    
+    Returns (crawler_cpus, loader_cpus), with up to half of the CPUs for the
+    loaders, or (None, None) where CPU affinity isn't supported (non-Linux)
+    or there are too few CPUs to split.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return None, None
+    cpus = sorted(os.sched_getaffinity(0))
+    num_loader_cpus = min(num_loaders, len(cpus) // 2)
+    if num_loader_cpus == 0:
+        return None, None
+    return cpus[:-num_loader_cpus], cpus[-num_loader_cpus:]
+
+def _pin_process(process, cpus):
+    """Restrict ``process`` to ``cpus``; pinning is only an optimization, so failures are just logged."""
+    try:
+        os.sched_setaffinity(process.pid, cpus)
+    except OSError as e:  # Includes ProcessLookupError for a process that has already exited
+        logger.warning("Could not pin process %s to CPUs %s: %s", process.pid, sorted(cpus), e)
+
+def _stop_processes(processes, grace=5):
+    """Give ``processes`` ``grace`` seconds in all to exit, then terminate the rest."""
+    deadline = time.monotonic() + grace
+    for p in processes:
+        p.join(max(0.0, deadline - time.monotonic()))
+    
+    for p in processes:
+        if p.is_alive():
+            p.terminate()
+
+class _LinkBatcher:
+    """
+    Stands in for a crawler's load queue, buffering the links put into it and
+    sending them on as one list, so each batch is pickled and sent only once.
+    Batches are tagged with ``generation``, the LoaderPool generation of the
+    download they belong to.
+    """
+    def __init__(self, queue, generation=0):
+        self.queue = queue
+        self.generation = generation
+        self.links = []
+        self.first_put = 0.0
+    
+    def put(self, item):
+        if not self.links:
+            self.first_put = time.monotonic()
+        self.links.append(item)
+        if len(self.links) >= LINK_BATCH:
+            self.flush()
+    
+    def flush_if_due(self):
+        if self.links and time.monotonic() - self.first_put >= LINK_FLUSH_INTERVAL:
+            self.flush()
+    
+    def flush(self):
+        if self.links:
+            self.queue.put((self.generation, self.links))
+            self.links = []
 
 class SafeYandexCrawler(YandexCrawler):
     """
     Extended version of YandexCrawler with additional error handling.
+    
+    If given, ``done_event`` is set when the crawler gives up, so that
+    safe_download stops waiting for the other processes. ``generation`` tags
+    the link batches sent to the loaders (see LoaderPool.reset).
     """
-    def __init__(self, *args, max_errors=10, **kwargs):
+    def __init__(self, *args, max_errors=10, done_event=None, generation=0, **kwargs):
         super().__init__(*args, **kwargs)
         self.consecutive_errors = 0
         self.max_errors = max_errors
+        self.backoff = ERROR_BACKOFF
+        self.done_event = done_event
+        self.load_queue = _LinkBatcher(self.load_queue, generation)
         
     def run(self):
-        global should_exit
         self.driver.get(self.start_link)
         
         try:
-            self._SafeYandexCrawler__open_first_preview()
+            self._YandexCrawler__open_first_preview()
         except Exception as e:
-            self.logger.critical(f"Process #{self.id} can't open the first image: {e}")
+            self.logger.critical("Process #%s can't open the first image: %s", self.id, e)
             self.logger.info("Exiting crawler due to initial error")
             self.is_active.value = False
-            should_exit = True
+            if self.done_event is not None:
+                self.done_event.set()
             self.driver.close()
             return
         
         while True:
-            if not self.is_active.value or should_exit:
-                self.logger.info(f"Process #{self.id} shutting down")
+            if not self.is_active.value:
+                self.logger.info("Process #%s shutting down", self.id)
                 self.driver.close()
                 return
             
+            self.load_queue.flush_if_due()
+            
             try:
                 self._YandexCrawler__get_image_link()
                 self._YandexCrawler__open_next_preview()
                 # Reset error counter on success
                 self.consecutive_errors = 0
+                self.backoff = ERROR_BACKOFF
             except Exception as e:
                 self.consecutive_errors += 1
-                self.logger.critical(f"Process #{self.id} error: {e}")
+                self.logger.critical("Process #%s error: %s", self.id, e)
                 
                 if self.consecutive_errors >= self.max_errors:
-                    self.logger.critical(f"Process #{self.id} reached max consecutive errors ({self.max_errors}). Shutting down.")
+                    self.logger.critical(
+                        "Process #%s reached max consecutive errors (%s). Shutting down.", self.id, self.max_errors
+                    )
                     self.is_active.value = False
-                    should_exit = True
+                    if self.done_event is not None:
+                        self.done_event.set()
                     self.driver.close()
                     return
                 
-                time.sleep(2)  # Wait a bit before retrying
+                # Wait a bit before retrying, with jitter so crawlers don't retry in lockstep
+                delay = self.backoff + random.uniform(0, self.backoff / 2)
+                self.backoff = min(self.backoff * 2, MAX_ERROR_BACKOFF)
+                if self.done_event is not None:
+                    self.done_event.wait(delay)  # Returns early on shutdown
+                else:
+                    time.sleep(delay)
+
+class SafeImageLoader(ImageLoader):
+    """
+    Extended version of ImageLoader that reuses one keep-alive HTTP session
+    per loader process instead of opening a new connection for every image.
+    
+    ``skip_files`` holds image hashes as ints (see _skip_keys).
+    If given, ``downloaded`` is a shared Value incremented for every image saved,
+    and ``done_event`` is set as soon as it reaches the shared ``target_count``.
+    If given, ``generation`` is the shared LoaderPool generation: batches from
+    an earlier one belong to a finished download and are dropped.
+    """
+    def __init__(
+        self, *args, downloaded=None, target_count=None, done_event=None, generation=None,
+        write_buffer_size=WRITE_BUFSIZE, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.downloaded = downloaded
+        self.target_count = target_count
+        self.done_event = done_event
+        self.generation = generation
+        self.write_buffer_size = write_buffer_size
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # Each loader fetches one image at a time, so a single connection per
+        # host is enough; keep pools for many hosts since images come from all over
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=1,
+            max_retries=Retry(total=3, backoff_factor=0.3),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def run(self):
+        while True:
+            if not self.is_active.value:
+                self.session.close()
+                return
+            
+            # Crawlers send their links in batches; None asks the loader to stop
+            item = self.load_queue.get()
+            if item is None:
+                self.session.close()
+                return
+            generation, batch = item
+            for link, (width, height) in batch:
+                # A batch can take minutes to get through, so check for shutdown between links
+                if not self.is_active.value or not self._is_current(generation):
+                    break
+                self._load(link, width, height, generation)
+    
+    def _is_current(self, generation):
+        """Return whether links tagged ``generation`` belong to the current download."""
+        return self.generation is None or generation == self.generation.value
+    
+    def _load(self, link, width, height, generation=0):
+        """Download the image at ``link`` and save it, unless it is too small or already saved."""
+        if (
+            width is not None
+            and height is not None
+            and (width < self.min_width or height < self.min_height)
+        ):
+            return
+        
+        self.logger.info(link)
+        try:
+            # Stream so that error responses are dropped without reading the body
+            with self.session.get(link, verify=False, timeout=10, stream=True) as response:
+                if not 200 <= response.status_code < 300:
+                    return
+                response.raw.decode_content = True
+                data = io.BytesIO()
+                shutil.copyfileobj(response.raw, data, self.write_buffer_size)
+            data.seek(0)
+            img = Image.open(data)
+        except Exception:
+            return
+        
+        width, height = img.size
+        digest = hashlib.sha256(np.array(img)).digest()
+        hash_name = digest.hex()
+        img_path = self.image_dir / (hash_name + ".png")
+        
+        if (
+            int.from_bytes(digest, "big") not in self.skip_files
+            and not img_path.exists()
+            and width >= self.min_width
+            and height >= self.min_height
+        ):
+            img = img.convert("RGB")
+            # Write to a temporary name and move it into place, so a loader terminated
+            # mid-save never leaves a truncated image that later runs would skip as saved
+            tmp_path = img_path.with_name(f".{hash_name}.{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, "wb", buffering=self.write_buffer_size) as f:
+                    img.save(f, "PNG")
+                os.replace(tmp_path, img_path)
+            except OSError:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+                return
+            if self.downloaded is not None:
+                # Under the lock LoaderPool.reset() takes, so an image from a finished
+                # download can't be counted towards, or stop, the next one
+                with self.downloaded.get_lock():
+                    if not self._is_current(generation):
+                        return
+                    self.downloaded.value += 1
+                    if self.done_event is not None and 0 < self.target_count.value <= self.downloaded.value:
+                        self.done_event.set()
+
+class LoaderPool:
+    """
+    A set of SafeImageLoader processes that can serve several safe_download calls.
+    
+    Passing a started pool to safe_download(loader_pool=...) saves respawning the
+    loaders for every search when downloading many searches into one directory.
+    Use it as a context manager so that the loaders are stopped at the end.
+    
+    With ``pin_cpus``, each loader is pinned to one of the CPUs set aside for
+    loaders by _split_cpus, so image decoding keeps its caches warm.
+    """
+    def __init__(
+        self,
+        image_size=(0, 0),
+        image_dir="downloaded_images",
+        skip_files=frozenset(),
+        num_queues=1,
+        loaders_per_queue=1,
+        queue_size=64,
+        write_buffer_size=WRITE_BUFSIZE,
+        pin_cpus=False
+    ):
+        self.pin_cpus = pin_cpus
+        self.load_queues = [Queue(queue_size) for _ in range(num_queues)]
+        skip_files = _skip_keys(skip_files)  # Once here rather than in every loader
+        self.is_active = Value("i", True)
+        self.downloaded = Value("i", 0)  # Images saved by the loaders for the current download
+        self.target_count = Value("i", 0)  # Images wanted by the current download, 0 for no limit
+        self.done_event = Event()  # Set when the current download should stop, for whatever reason
+        self.generation = Value("i", 0)  # Bumped by reset(); links from earlier downloads are dropped
+        self.processes = [
+            Process(
+                target=LoaderPool._run_loader,
+                args=(
+                    self.load_queues[i % num_queues], image_size, image_dir, skip_files,
+                    self.is_active, self.downloaded, self.target_count, self.done_event,
+                    self.generation, write_buffer_size,
+                ),
+                daemon=True,
+            )
+            for i in range(num_queues * loaders_per_queue)
+        ]
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    @staticmethod
+    def _run_loader(
+        load_queue, image_size, image_dir, skip_files, is_active, downloaded, target_count, done_event,
+        generation, write_buffer_size
+    ):
+        # The parent stops the loaders through is_active; a Ctrl+C reaching them directly
+        # could interrupt a save half-way and leave a partial image behind
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        loader = SafeImageLoader(
+            load_queue=load_queue,
+            image_size=image_size,
+            image_dir=image_dir,
+            skip_files=skip_files,
+            is_active=is_active,
+            downloaded=downloaded,
+            target_count=target_count,
+            done_event=done_event,
+            generation=generation,
+            write_buffer_size=write_buffer_size,
+        )
+        loader.run()
+    
+    def start(self):
+        _start_processes(self.processes)
+        if self.pin_cpus:
+            _, loader_cpus = _split_cpus(len(self.processes))
+            if loader_cpus:
+                for i, process in enumerate(self.processes):
+                    _pin_process(process, {loader_cpus[i % len(loader_cpus)]})
+    
+    def reset(self, image_count):
+        """
+        Prepare the pool for a new download of ``image_count`` images (0 for no limit).
+        
+        Returns the new generation to tag that download's links with. Loaders still
+        busy with an earlier one's batch stop at its next link, and don't count it.
+        """
+        with self.downloaded.get_lock():
+            self.generation.value += 1
+            self.downloaded.value = 0
+            self.target_count.value = image_count
+            self.done_event.clear()
+            return self.generation.value
+    
+    def drain(self):
+        """Drop the links still queued, such as those left over from a finished search."""
+        for load_queue in self.load_queues:
+            try:
+                while True:
+                    load_queue.get_nowait()
+            except queue.Empty:
+                pass
+    
+    def close(self):
+        """Stop the loaders, giving them a few seconds to finish their current image."""
+        self.is_active.value = False
+        self.drain()
+        for i in range(len(self.processes)):
+            self.load_queues[i % len(self.load_queues)].put(None)
+        _stop_processes(self.processes)
 
 def __start_safe_crawler(
-    start_link: str, load_queue: Queue, id: int, headless_mode: bool, is_active, max_errors: int
+    start_link: str, load_queue: Queue, id: int, headless_mode: bool, is_active, max_errors: int,
+    done_event, generation: int
 ):
     crawler = SafeYandexCrawler(
         start_link=start_link,
@@ -99,7 +462,9 @@ def __start_safe_crawler(
         id=id,
         headless_mode=headless_mode,
         is_active=is_active,
-        max_errors=max_errors
+        max_errors=max_errors,
+        done_event=done_event,
+        generation=generation
     )
     crawler.run()
 
@@ -112,7 +477,10 @@ def safe_download(
     loaders_per_link=1,
     headless_mode=False,
     max_errors=10,
-    timeout=300  # 5 minutes timeout
+    timeout=300,  # 5 minutes timeout
+    write_buffer_size=WRITE_BUFSIZE,
+    loader_pool=None,
+    pin_cpus=False
 ):
     """
     Safe version of the download function with error handling and timeout.
@@ -122,139 +490,146 @@ def safe_download(
         image_size: Minimum image size as (width, height)
         image_count: Number of images to download (0 for unlimited)
         image_dir: Directory to save downloaded images
-        skip_files: Set of file hashes to skip
+        skip_files: Set (any container) of file hashes to skip, as hex names or ints
         loaders_per_link: Number of loader processes per link
         headless_mode: Whether to run in headless mode
         max_errors: Maximum number of consecutive errors before exiting
         timeout: Maximum time in seconds to run before exiting
+        write_buffer_size: Buffer size in bytes used when reading and saving images
+        loader_pool: Started LoaderPool to load the images with, kept running
+            afterwards; by default one is started for this call only, from the
+            image_size, skip_files, loaders_per_link and write_buffer_size above
+        pin_cpus: On Linux, keep the crawlers (and their browsers) and the loaders
+            on separate CPUs; applies to a loader pool started for this call
     """
     proc_num = len(links)
-    load_queue = Queue(10 * proc_num)
     is_active = Value("i", True)
     
     # Create output directory
     Path(image_dir).mkdir(parents=True, exist_ok=True)
     
-    # Set up signal handler for graceful exit
+    own_pool = loader_pool is None
+    if own_pool:
+        # Room for bursts of links from the crawlers, scaled to the number of loaders draining them
+        queue_size = max(64, 32 * proc_num * loaders_per_link)
+        
+        # Split the links over a few queues so the loaders don't all contend for one lock;
+        # each crawler feeds one queue and each loader drains one
+        num_queues = max(1, min(proc_num, loaders_per_link))
+        loader_pool = LoaderPool(
+            image_size=image_size,
+            image_dir=image_dir,
+            skip_files=skip_files,
+            num_queues=num_queues,
+            loaders_per_queue=proc_num * loaders_per_link // num_queues,
+            queue_size=queue_size // num_queues,
+            write_buffer_size=write_buffer_size,
+            pin_cpus=pin_cpus,
+        )
+        loader_pool.start()
+    generation = loader_pool.reset(image_count)
+    load_queues = loader_pool.load_queues
+    downloaded = loader_pool.downloaded
+    done_event = loader_pool.done_event
+    
+    # Set up signal handler for graceful exit; it only flags the shutdown,
+    # which is logged once the main thread wakes up
+    interrupted = False
+    
     def signal_handler(sig, frame):
-        logger.info("Received interrupt signal. Shutting down...")
+        nonlocal interrupted
+        interrupted = True
         is_active.value = False
-        global should_exit
-        should_exit = True
+        # The handler runs on the main thread, usually while it is blocked in done_event.wait();
+        # setting the event from there would wait forever for that same thread to wake up
+        threading.Thread(target=done_event.set, daemon=True).start()
     
-    signal.signal(signal.SIGINT, signal_handler)
+    previous_handler = signal.signal(signal.SIGINT, signal_handler)
     
     # Create crawler processes
     crawlers = [
         Process(
             target=__start_safe_crawler,
-            args=(links[i], load_queue, i, headless_mode, is_active, max_errors),
+            args=(
+                links[i], load_queues[i % len(load_queues)], i, headless_mode, is_active, max_errors, done_event,
+                generation,
+            ),
             daemon=True,
         )
         for i in range(proc_num)
     ]
     
-    # Create loader processes
-    loaders = [
-        Process(
-            target=__start_loader,
-            args=(load_queue, image_size, image_dir, skip_files, is_active),
-            daemon=True,
-        )
-        for _ in range(proc_num * loaders_per_link)
-    ]
+    # Start the crawlers; the loaders are already running
+    processes = crawlers
+    _start_processes(processes)
+    if pin_cpus:
+        # The browsers inherit their crawler's CPUs, so crawlers share all theirs
+        crawler_cpus, _ = _split_cpus(len(loader_pool.processes))
+        if crawler_cpus:
+            for process in crawlers:
+                _pin_process(process, crawler_cpus)
     
-    # Create checker process
-    checker = Process(
-        target=__start_checker,
-        args=(image_dir, image_count, is_active),
-        daemon=True,
-    )
+    # Report progress until the download is done: every second while the count
+    # changes, backing off to once a minute while it doesn't
+    def report_progress():
+        interval = 1.0
+        last_count = 0
+        while not done_event.wait(interval):
+            count = downloaded.value
+            if count == last_count:
+                interval = min(interval * 2, 60.0)
+            else:
+                interval = 1.0
+                last_count = count
+            logger.info("Downloaded %s images so far...", count)
+    
+    progress_thread = threading.Thread(target=report_progress, daemon=True)
+    progress_thread.start()
     
-    # Start all processes
-    processes = []
-    processes.extend(crawlers)
-    processes.extend(loaders)
-    processes.append(checker)
+    # Stop waiting as soon as every process has exited on its own
+    def watch_processes():
+        sentinels = [p.sentinel for p in processes]
+        while sentinels:
+            for sentinel in wait(sentinels):
+                sentinels.remove(sentinel)
+        done_event.set()
     
-    for process in processes:
-        process.start()
+    watch_thread = threading.Thread(target=watch_processes, daemon=True)
+    watch_thread.start()
     
-    # Monitor processes and implement timeout
-    start_time = time.time()
+    # Wait for the download to finish, or for the timeout
     try:
-        while any(p.is_alive() for p in processes):
-            # Check if we should exit
-            if should_exit or not is_active.value:
-                logger.info("Stopping all processes...")
-                is_active.value = False
-                break
-            
-            # Check timeout
-            if timeout > 0 and time.time() - start_time > timeout:
-                logger.info(f"Reached timeout of {timeout} seconds. Shutting down...")
-                is_active.value = False
-                break
-            
-            # Count downloaded images
-            downloaded = 0
-            for _, _, files in os.walk(image_dir):
-                downloaded = len(files) - len(skip_files)
-                break
-            
-            logger.info(f"Downloaded {downloaded} images so far...")
-            
-            time.sleep(5)  # Check status every 5 seconds
+        if done_event.wait(timeout if timeout > 0 else None):
+            if interrupted:
+                logger.info("Received interrupt signal. Shutting down...")
+            elif 0 < image_count <= downloaded.value:
+                logger.info("The required number of images is reached.")
+            logger.info("Stopping all processes...")
+        else:
+            logger.info("Reached timeout of %s seconds. Shutting down...", timeout)
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt received. Shutting down...")
-        is_active.value = False
     finally:
         # Wait for processes to terminate
         is_active.value = False
+        done_event.set()
         
-        # Give processes a chance to terminate gracefully
-        for i in range(5):
-            if not any(p.is_alive() for p in processes):
-                break
-            time.sleep(1)
+        # Give processes a chance to terminate gracefully, then force the rest
+        _stop_processes(processes)
         
-        # Force terminate any remaining processes
-        for p in processes:
-            if p.is_alive():
-                p.terminate()
+        # A reused pool's done_event is cleared by the next call's reset(), so these
+        # must not outlive this call: a late set() would stop the next download at once
+        progress_thread.join()
+        watch_thread.join()
         
-        # Count final number of downloaded images
-        downloaded = 0
-        for _, _, files in os.walk(image_dir):
-            downloaded = len(files) - len(skip_files)
-            break
+        # Stop the loaders, or clear the queues for the next search
+        if own_pool:
+            loader_pool.close()
+        else:
+            loader_pool.drain()
         
-        logger.info(f"Download complete. Downloaded {downloaded} images.")
-
-# Helper functions from the original download.py
-def __start_loader(
-    load_queue: Queue,
-    image_size,
-    image_dir,
-    skip_files,
-    is_active,
-):
-    crawler = ImageLoader(
-        load_queue=load_queue,
-        image_size=image_size,
-        image_dir=image_dir,
-        skip_files=skip_files,
-        is_active=is_active,
-    )
-    crawler.run()
-
-def __start_checker(image_dir, image_count, is_active):
-    checker = CountChecker(
-        image_dir=image_dir,
-        image_count=image_count,
-        is_active=is_active,
-    )
-    checker.run()
+        logger.info("Download complete. Downloaded %s images.", downloaded.value)
+        signal.signal(signal.SIGINT, previous_handler)
 
 def main():
     parser = argparse.ArgumentParser(description="Safe Yandex Images Crawler")
@@ -306,21 +681,18 @@ def main():
     if args.search.startswith("http"):
         search_url = args.search
     else:
-        search_url = f"https://yandex.com/images/search?text={args.search.replace(' ', '%20')}"
+        search_url = f"https://yandex.com/images/search?text={quote_plus(args.search)}"
     
     # Process image size
     try:
-        width, height = map(int, args.size.split("x"))
-        image_size = (width, height)
+        width, _, height = args.size.partition("x")
+        image_size = (int(width), int(height))
     except ValueError:
-        logger.error(f"Invalid size format: {args.size}. Using default 0x0.")
+        logger.error("Invalid size format: %s. Using default 0x0.", args.size)
         image_size = (0, 0)
     
     # Get list of existing files to skip
-    skip_files = set()
-    for _, _, files in os.walk(args.dir):
-        skip_files.update([file.split(".")[0] for file in files])
-        break
+    skip_files = list_basenames(args.dir) if os.path.isdir(args.dir) else set()
     
     print(f"Starting download of {args.count if args.count > 0 else 'unlimited'} images")
     print(f"Search: {args.search}")
@@ -339,7 +711,7 @@ def main():
         image_size=image_size,
         image_count=args.count,
         image_dir=args.dir,
-        skip_files=frozenset(skip_files),
+        skip_files=skip_files,
         loaders_per_link=2,
         headless_mode=args.headless,
         max_errors=args.max_errors,
@@ -3,13 +3,20 @@ GUI application for Yandex Images Crawler.
 This provides a user-friendly interface for downloading images from Yandex.
 """
 
+import atexit
+import contextlib
+import hashlib
+import io
 import os
+import queue
+import re
 import sys
 import time
 import signal
 import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import subprocess
 import logging
@@ -47,6 +54,348 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import WebDriverException
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from PIL import Image
+
+from image_files import list_basenames
+
+# Optional: used to reap chromedriver/Chrome processes that survive driver.quit()
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def _cancel_pending(futures):
+    """
+    Cancel the downloads in ``futures`` that haven't started yet.
+    
+    Does by hand what ThreadPoolExecutor.shutdown(cancel_futures=True) does on
+    Python 3.9+; the downloads already running are left to finish.
+    """
+    for future in list(futures):
+        future.cancel()
+
+# ChromeDriver path resolved by ChromeDriverManager, reused for every later launch in this process
+_CHROMEDRIVER_PATH = None
+
+def _chromedriver_path(refresh=False):
+    """Return the ChromeDriver path, only calling ChromeDriverManager().install() when there is no usable cached one."""
+    global _CHROMEDRIVER_PATH
+    if refresh or _CHROMEDRIVER_PATH is None or not os.path.exists(_CHROMEDRIVER_PATH):
+        _CHROMEDRIVER_PATH = ChromeDriverManager().install()
+        logger.info("ChromeDriver installed at: %s", _CHROMEDRIVER_PATH)
+    return _CHROMEDRIVER_PATH
+
+# Process names (lowercased) of chromedriver and Chrome, as reaped by BrowserPool.drain()
+_CHROME_PROCESS_NAMES = ("chromedriver", "chromedriver.exe", "chrome", "chrome.exe", "chromium", "chromium-browser")
+
+# Chrome features the crawler never uses; turning them off saves the background processes,
+# network traffic and memory they would otherwise cost in every browser session
+_CHROME_LEAN_ARGS = (
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,OptimizationHints,MediaRouter",
+    "--mute-audio",
+)
+
+class BrowserPool:
+    """
+    Reference-counted holder for a single Chrome WebDriver shared across downloads.
+    
+    Repeated Start/Stop cycles reuse the same browser instead of installing ChromeDriver
+    and launching Chrome every time; the browser is only quit by ``drain()``.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._driver = None
+        self._headless = None
+        self._refcount = 0
+        # PID of the current chromedriver, readable without the lock so a stuck download can be reaped
+        self.service_pid = None
+    
+    @staticmethod
+    def _launch(headless):
+        """Install ChromeDriver if needed and start a new Chrome instance."""
+        chrome_options = Options()
+        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option("useAutomationExtension", False)
+        chrome_options.add_argument("--incognito")
+        # Without this, GPU/renderer processes often outlive driver.quit() (notably on Windows)
+        chrome_options.add_argument("--disable-gpu")
+        for arg in _CHROME_LEAN_ARGS:
+            chrome_options.add_argument(arg)
+        if headless:
+            chrome_options.add_argument("--headless")
+        
+        cached = _CHROMEDRIVER_PATH is not None
+        try:
+            driver = webdriver.Chrome(service=Service(_chromedriver_path()), options=chrome_options)
+        except WebDriverException:
+            if not cached:
+                raise
+            # Chrome may have updated past the cached driver; resolve it again and retry once
+            driver = webdriver.Chrome(service=Service(_chromedriver_path(refresh=True)), options=chrome_options)
+        
+        driver.execute_script(
+            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+        )
+        return driver
+    
+    @staticmethod
+    def _is_alive(driver):
+        """Return True if the chromedriver process is running and the browser session still answers."""
+        try:
+            if driver.service.process.poll() is not None or not driver.session_id:
+                return False
+            driver.current_url  # Round-trip to the browser; raises if the session is gone
+            return True
+        except Exception:
+            return False
+    
+    @staticmethod
+    def _process_tree(pid):
+        """Return the psutil processes for ``pid`` and all of its descendants (empty without psutil)."""
+        if psutil is None or pid is None:
+            return []
+        try:
+            parent = psutil.Process(pid)
+            return [parent] + parent.children(recursive=True)
+        except psutil.Error:
+            return []
+    
+    @staticmethod
+    def _kill(processes):
+        for process in processes:
+            try:
+                process.kill()
+            except psutil.Error:
+                pass
+    
+    @classmethod
+    def _reap(cls, processes):
+        """Terminate ``processes``, then kill whichever are still running after a short grace period."""
+        if not processes:
+            return
+        for process in processes:
+            try:
+                process.terminate()
+            except psutil.Error:
+                pass
+        _, alive = psutil.wait_procs(processes, timeout=2)
+        cls._kill(alive)
+    
+    @staticmethod
+    def _chrome_children():
+        """Return this process's chromedriver/Chrome descendants (empty without psutil)."""
+        if psutil is None:
+            return []
+        processes = []
+        for child in psutil.Process().children(recursive=True):
+            try:
+                if child.name().lower() in _CHROME_PROCESS_NAMES:
+                    processes.append(child)
+            except psutil.Error:
+                pass
+        return processes
+    
+    @classmethod
+    def _quit(cls, driver):
+        """Quit ``driver`` and kill any chromedriver/Chrome process it leaves behind."""
+        try:
+            pid = driver.service.process.pid
+        except Exception:
+            pid = None
+        # Collect the tree first: once chromedriver exits, its children are reparented and can't be found
+        processes = cls._process_tree(pid)
+        
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        
+        cls._reap(processes)
+    
+    def kill(self):
+        """Forcefully kill the current chromedriver and its browser without waiting for the lock."""
+        self._kill(self._process_tree(self.service_pid))
+    
+    def acquire(self, headless):
+        """
+        Return the shared driver, launching (or relaunching) Chrome if there is no usable one.
+        
+        Args:
+            headless: Whether a newly launched browser should run in headless mode.
+                An idle browser in the other mode is replaced; a busy one is shared as is.
+        """
+        # The launch happens under the lock, so concurrent callers wait for it instead of starting their own
+        with self._lock:
+            driver = self._driver
+            if driver is not None and (
+                not self._is_alive(driver) or (self._refcount == 0 and self._headless != headless)
+            ):
+                self._quit(driver)
+                driver = self._driver = None
+            
+            if driver is None:
+                driver = self._launch(headless)
+                self._driver, self._headless = driver, headless
+                self.service_pid = driver.service.process.pid
+            
+            self._refcount += 1
+            return driver
+    
+    def release(self):
+        """Give back a driver obtained from ``acquire()``; the browser stays open for the next download."""
+        with self._lock:
+            self._refcount = max(0, self._refcount - 1)
+    
+    @contextlib.contextmanager
+    def session(self, headless):
+        """Context manager around ``acquire()``/``release()`` that always gives the driver back."""
+        driver = self.acquire(headless)
+        try:
+            yield driver
+        finally:
+            self.release()
+    
+    def drain(self):
+        """Quit the shared browser, if any, and reap any other chromedriver/Chrome child left behind."""
+        with self._lock:
+            if self._driver is not None:
+                self._quit(self._driver)
+            self._driver = None
+            self._refcount = 0
+            self.service_pid = None
+            # Catches browsers the pool lost track of, e.g. a launch interrupted half-way
+            self._reap(self._chrome_children())
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0",
+    "Referer": "https://yandex.com/",
+}
+
+# XPaths of elements that indicate a CAPTCHA page
+_CAPTCHA_XPATHS = (
+    "//div[contains(@class, 'CheckboxCaptcha')]",
+    "//div[contains(@class, 'Captcha')]",
+    "//div[contains(@class, 'captcha')]",
+    "//iframe[contains(@src, 'captcha')]",
+    "//iframe[contains(@src, 'recaptcha')]",
+    "//div[contains(text(), 'robot')]",
+    "//div[contains(text(), 'CAPTCHA')]",
+    "//div[contains(text(), 'captcha')]",
+)
+
+# Classes of the viewer elements that may hold the image size ("W×H") and the image link
+_SIZE_SOURCES = (
+    "OpenImageButton-SizesButton",
+    "MMViewerButtons-ImageSizes",
+    "OpenImageButton-SaveSize",
+    "Button2-Text",
+)
+_LINK_SOURCES = (
+    "OpenImageButton-Save",
+    "MMViewerButtons-OpenImage",
+    "MMViewerButtons-Button",
+    "Button2_link",
+    "Button2_view_default",
+)
+
+# Image size as shown in the viewer, e.g. "1920×1080" or "800 x 600 px"; the whole text has to match,
+# since some of the size classes are generic button classes
+_SIZE_RE = re.compile(r"\s*(\d+)\s*[×xX]\s*(\d+)\s*(?:px)?\s*")
+
+# Hosts whose links point back at Yandex's own copies rather than the original image
+_BLACKLIST = ("yandex-images", "avatars.mds.yandex.net")
+
+# Collects the candidate size texts and the link of the image open in the viewer. Takes the size
+# classes, link classes and link blacklist as arguments; a blacklisted link is only returned if
+# there is no other one. The size texts are parsed with _SIZE_RE
+_FIND_IMAGE_JS = r"""
+const [sizeSources, linkSources, blacklist] = arguments;
+const sizes = [];
+let link = null, fallback = null;
+for (const cls of sizeSources) {
+    for (const elem of document.getElementsByClassName(cls)) {
+        if (/\d/.test(elem.textContent)) sizes.push(elem.textContent);
+    }
+}
+for (const cls of linkSources) {
+    for (const elem of document.getElementsByClassName(cls)) {
+        const href = elem.href;
+        if (!href) continue;
+        if (!blacklist.some(b => href.includes(b))) { link = href; break; }
+        if (!fallback) fallback = href;
+    }
+    if (link) break;
+}
+return {sizes: sizes, link: link || fallback, blacklisted: !link && !!fallback};
+"""
+
+# Returns the first of the XPaths passed as arguments[0] that matches an element, or null
+_FIRST_XPATH_MATCH_JS = """
+for (const xpath of arguments[0]) {
+    try {
+        const result = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+        if (result.singleNodeValue) return xpath;
+    } catch (e) {}
+}
+return null;
+"""
+
+# How often (ms) the GUI applies updates queued by the download threads, and how many per tick
+UI_PUMP_INTERVAL = 100
+UI_PUMP_BATCH = 50
+
+# Lines kept in the status box; once exceeded, the oldest are dropped so LOG_TRIM_LINES fewer remain
+MAX_LOG_LINES = 2000
+LOG_TRIM_LINES = 500
+
+# Selectors tried, in order, for the first search result to open in the viewer
+_FIRST_IMAGE_SELECTORS = (
+    "img[class*='ImagesContentImage-Image_clickable']",
+    "img[class*='serp-item__thumb']",
+    ".serp-item__link",
+    ".serp-item",
+    "div[class*='serp-item']",
+    "div[data-grid-position]",
+    "a[href*='images/search'] img",
+    "div[class*='Image'] img",
+)
+
+# Returns [selector, element] for each of the CSS selectors passed as arguments[0] that matches
+# an element, in order, with the first element it matches
+_SELECTOR_MATCHES_JS = """
+const matches = [];
+for (const selector of arguments[0]) {
+    const elem = document.querySelector(selector);
+    if (elem) matches.push([selector, elem]);
+}
+return matches;
+"""
+
+# How long (ms) Stop waits for the download thread to let go of the browser before killing it
+STOP_GRACE_PERIOD = 5000
+
+# Number of images downloaded in parallel while the browser keeps paging through results
+DOWNLOAD_WORKERS = 8
+
+# Lower bound on the encoded size of an image, in bytes per pixel of the minimum size. Deliberately
+# lenient (heavily compressed JPEGs get close to it); it only weeds out thumbnails and placeholders
+MIN_BYTES_PER_PIXEL = 0.02
+
+# Shared by every download started from the GUI
+browser_pool = BrowserPool()
+# Last-resort cleanup for exits that bypass on_closing (uncaught exceptions, sys.exit from elsewhere)
+atexit.register(browser_pool.drain)
 
 class YandexCrawlerGUI:
     def __init__(self, root):
@@ -81,6 +430,13 @@ class YandexCrawlerGUI:
         self.download_thread = None
         self.stop_event = threading.Event()
         self.driver = None
+        # Images saved by the current download; written by the download workers under count_lock
+        self.downloaded_count = 0
+        self.count_lock = threading.Lock()
+        
+        # Log lines, progress updates and other widget changes from the download threads,
+        # applied on the Tk main thread by _pump_ui
+        self.ui_queue = queue.Queue()
         
         # Create main frame
         self.main_frame = ttk.Frame(self.root, padding="20")
@@ -88,6 +444,7 @@ class YandexCrawlerGUI:
         
         # Create and place widgets
         self.create_widgets()
+        self.root.after(UI_PUMP_INTERVAL, self._pump_ui)
         
     def create_widgets(self):
         # Title
@@ -166,7 +523,7 @@ class YandexCrawlerGUI:
         self.stop_button = ttk.Button(button_frame, text="Stop Download", command=self.stop_download, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=5)
         
-        ttk.Button(button_frame, text="Exit", command=self.root.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Exit", command=lambda: on_closing(self, confirm=False)).pack(side=tk.RIGHT, padx=5)
         
         # Add some initial status text
         self.log_message("Ready to download images from Yandex.")
@@ -178,53 +535,66 @@ class YandexCrawlerGUI:
             self.output_dir_var.set(directory)
     
     def log_message(self, message):
+        # Safe to call from any thread; the line is added to the status box by _pump_ui
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.status_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.status_text.see(tk.END)
+        self.ui_queue.put(("log", f"[{timestamp}] {message}"))
         logger.info(message)
     
+    def _pump_ui(self):
+        """Apply up to UI_PUMP_BATCH queued updates, then reschedule itself. Runs on the Tk main thread."""
+        log_lines = []
+        try:
+            for _ in range(UI_PUMP_BATCH):
+                try:
+                    kind, payload = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                
+                if kind == "log":
+                    log_lines.append(payload)
+                elif kind == "progress":
+                    downloaded, target_count = payload
+                    self.progress_var.set(min(100, int(downloaded / target_count * 100)))
+                elif kind == "call":
+                    try:
+                        payload()
+                    except Exception:
+                        logger.exception("Queued UI update failed")
+            
+            # One insert and scroll per tick, however many lines arrived
+            if log_lines:
+                self.status_text.insert(tk.END, "\n".join(log_lines) + "\n")
+                self.status_text.see(tk.END)
+                
+                # Keep the status box from growing without bound on long runs; counted in
+                # widget lines, since a message (e.g. an exception) can span several
+                line_count = int(self.status_text.index("end-1c").split(".")[0])
+                if line_count > MAX_LOG_LINES:
+                    self.status_text.delete("1.0", f"{line_count - MAX_LOG_LINES + LOG_TRIM_LINES}.0")
+        finally:
+            # Always keep the pump running, whatever went wrong above
+            self.root.after(UI_PUMP_INTERVAL, self._pump_ui)
+    
     def validate_inputs(self):
         # Check search term
         if not self.search_var.get().strip():
             messagebox.showerror("Input Error", "Please enter a search term or URL.")
             return False
         
-        # Check count
-        try:
-            count = int(self.count_var.get())
-            if count < 0:
-                raise ValueError("Count must be a non-negative integer.")
-        except ValueError:
-            messagebox.showerror("Input Error", "Number of images must be a non-negative integer.")
-            return False
-        
-        # Check width and height
-        try:
-            width = int(self.width_var.get())
-            height = int(self.height_var.get())
-            if width < 0 or height < 0:
-                raise ValueError("Width and height must be non-negative integers.")
-        except ValueError:
-            messagebox.showerror("Input Error", "Width and height must be non-negative integers.")
-            return False
-        
-        # Check max errors
-        try:
-            max_errors = int(self.max_errors_var.get())
-            if max_errors <= 0:
-                raise ValueError("Max errors must be a positive integer.")
-        except ValueError:
-            messagebox.showerror("Input Error", "Max errors must be a positive integer.")
-            return False
-        
-        # Check timeout
-        try:
-            timeout = int(self.timeout_var.get())
-            if timeout < 0:
-                raise ValueError("Timeout must be a non-negative integer.")
-        except ValueError:
-            messagebox.showerror("Input Error", "Timeout must be a non-negative integer.")
-            return False
+        # Check the integer fields: (variable, smallest allowed value, error message)
+        integer_fields = (
+            (self.count_var, 0, "Number of images must be a non-negative integer."),
+            (self.width_var, 0, "Width and height must be non-negative integers."),
+            (self.height_var, 0, "Width and height must be non-negative integers."),
+            (self.max_errors_var, 1, "Max errors must be a positive integer."),
+            (self.timeout_var, 0, "Timeout must be a non-negative integer."),
+        )
+        for var, minimum, message in integer_fields:
+            # isdecimal() accepts exactly the digits int() does, and rules out signs and blanks up front
+            value = var.get().strip()
+            if not value.isdecimal() or int(value) < minimum:
+                messagebox.showerror("Input Error", message)
+                return False
         
         # Check output directory
         output_dir = Path(self.output_dir_var.get())
@@ -246,6 +616,7 @@ class YandexCrawlerGUI:
         
         self.is_downloading = True
         self.stop_event.clear()
+        self.downloaded_count = 0
         
         # Update UI
         self.start_button.config(state=tk.DISABLED)
@@ -259,45 +630,117 @@ class YandexCrawlerGUI:
         self.download_thread = threading.Thread(target=self.download_images)
         self.download_thread.daemon = True
         self.download_thread.start()
-        
-        # Start progress update
-        self.root.after(1000, self.update_progress)
     
     def stop_download(self):
-        if not self.is_downloading:
+        if not self.is_downloading or self.stop_event.is_set():
             return
         
         self.log_message("Stopping download...")
         self.stop_event.set()
-        
-        # Wait for thread to finish
-        if self.download_thread and self.download_thread.is_alive():
-            self.download_thread.join(timeout=5.0)
-        
-        self.is_downloading = False
-        self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
         
-        self.log_message("Download stopped.")
+        # The download thread re-enables Start once it has actually finished; if it is still
+        # stuck in the browser after the grace period, kill the browser so it can unwind
+        thread = self.download_thread
+        self.root.after(STOP_GRACE_PERIOD, lambda: self._kill_stuck_browser(thread))
+    
+    def _kill_stuck_browser(self, thread):
+        """Kill the pooled browser if ``thread`` is still running and still holding it."""
+        if thread is self.download_thread and thread.is_alive() and self.driver is not None:
+            self.log_message("Download thread is not responding; killing the browser.")
+            browser_pool.kill()
     
-    def update_progress(self):
-        if not self.is_downloading:
+    def _download_one(self, link, session, width, height, count, output_path, known_hashes):
+        """
+        Download a single image and save it if it is new and large enough. Runs on the download pool.
+        
+        Args:
+            link: Image URL
+            session: Shared requests session
+            width, height: Minimum image size
+            count: Target number of images (0 for unlimited)
+            output_path: Directory to save the image to
+            known_hashes: Names of the images already saved; shared between workers, guarded by ``count_lock``
+        """
+        # Nothing to do after Stop or once the target is reached; the lock below has the final say
+        if self.stop_event.is_set() or (count > 0 and self.downloaded_count >= count):
             return
         
-        # Get count of downloaded images
-        output_dir = Path(self.output_dir_var.get())
-        if output_dir.exists():
-            downloaded = len(list(output_dir.glob("*.png")))
-            target_count = int(self.count_var.get())
+        try:
+            response = session.get(link, verify=False, timeout=10, stream=True)
             
-            if target_count > 0:
-                progress = min(100, int(downloaded / target_count * 100))
-                self.progress_var.set(progress)
-        
-        # Schedule next update
-        self.root.after(1000, self.update_progress)
+            # Look at the headers before reading the body, so unsuitable responses aren't downloaded
+            content_type = response.headers.get("Content-Type", "")
+            content_length = int(response.headers.get("Content-Length") or 0)
+            if not 200 <= response.status_code < 300:
+                response.close()
+                return
+            if content_type.startswith("text/"):
+                response.close()
+                self.log_message(f"Skipping non-image response ({content_type}).")
+                return
+            if content_length and content_length < width * height * MIN_BYTES_PER_PIXEL:
+                response.close()
+                self.log_message(f"Skipping image: {content_length} bytes is too small for {width}x{height}.")
+                return
+            
+            # Hash the downloaded bytes, so duplicates are skipped without decoding them
+            data = response.content
+            hash_name = hashlib.sha256(data).hexdigest()
+            img_path = output_path / (hash_name + ".png")
+            if hash_name in known_hashes or img_path.exists():
+                self.log_message("Skipping already downloaded image.")
+                return
+            
+            img = Image.open(io.BytesIO(data))
+            img_width, img_height = img.size
+            if img_width < width or img_height < height:
+                return
+            
+            # Claim the name and a slot towards the target before saving, so parallel
+            # workers neither save the same image twice nor overshoot the count
+            with self.count_lock:
+                if hash_name in known_hashes or (count > 0 and self.downloaded_count >= count):
+                    return
+                known_hashes.add(hash_name)
+                self.downloaded_count += 1
+                number = self.downloaded_count
+            
+            try:
+                if img.format == "PNG" and img.mode == "RGB":
+                    # Already what we'd produce: write the downloaded bytes instead of re-encoding them
+                    with open(img_path, "wb") as f:
+                        f.write(data)
+                else:
+                    if img.mode != "RGB":
+                        img = img.convert("RGB")
+                    img.save(img_path, "PNG")
+            except Exception:
+                with self.count_lock:
+                    known_hashes.discard(hash_name)
+                    self.downloaded_count -= 1
+                raise
+            self.log_message(f"Downloaded image {number}: {img_width}x{img_height}")
+            if count > 0:
+                self.ui_queue.put(("progress", (number, count)))
+        except Exception as e:
+            self.log_message(f"Error downloading image: {e}")
     
     def download_images(self):
+        # One session for the whole run, so image downloads reuse connections to the CDN hosts
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.3),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+        # Downloads submitted but not finished yet, so the queued ones can be cancelled
+        pending = set()
+        
         try:
             # Get parameters
             search = self.search_var.get().strip()
@@ -320,311 +763,247 @@ class YandexCrawlerGUI:
             self.log_message(f"Minimum image size: {width}x{height}")
             self.log_message(f"Output directory: {output_dir}")
             
-            # Setup Chrome options
-            chrome_options = Options()
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option("useAutomationExtension", False)
-            chrome_options.add_argument("--incognito")
-            if headless:
-                chrome_options.add_argument("--headless")
-            
-            # Install ChromeDriver
+            # Get a browser from the pool (reused across downloads, launched on first use);
+            # leaving the block hands it back even if the download fails part-way
             self.log_message("Setting up ChromeDriver...")
-            chrome_driver_path = ChromeDriverManager().install()
-            self.log_message(f"ChromeDriver installed at: {chrome_driver_path}")
-            
-            # Create WebDriver
-            service = Service(chrome_driver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.driver.execute_script(
-                "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-            )
-            
-            # Navigate to search URL
-            self.log_message(f"Opening {search_url}")
-            self.driver.get(search_url)
-            
-            # Create output directory
-            output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
-            
-            # Get initial file count
-            initial_files = set()
-            for _, _, files in os.walk(output_dir):
-                initial_files.update([file.split(".")[0] for file in files])
-                break
-            
-            # Check for CAPTCHA
-            self.log_message("Checking for CAPTCHA...")
-            try:
-                # Look for common CAPTCHA elements
-                captcha_elements = [
-                    "//div[contains(@class, 'CheckboxCaptcha')]",
-                    "//div[contains(@class, 'Captcha')]",
-                    "//div[contains(@class, 'captcha')]",
-                    "//iframe[contains(@src, 'captcha')]",
-                    "//iframe[contains(@src, 'recaptcha')]",
-                    "//div[contains(text(), 'robot')]",
-                    "//div[contains(text(), 'CAPTCHA')]",
-                    "//div[contains(text(), 'captcha')]"
-                ]
+            start_time = None
+            with browser_pool.session(headless) as driver:
+                self.driver = driver
                 
-                captcha_found = False
-                for xpath in captcha_elements:
-                    try:
-                        elements = self.driver.find_elements("xpath", xpath)
-                        if elements:
-                            captcha_found = True
-                            break
-                    except:
-                        pass
+                # Navigate to search URL
+                self.log_message(f"Opening {search_url}")
+                self.driver.get(search_url)
                 
-                if captcha_found:
-                    self.log_message("CAPTCHA detected! Please solve the CAPTCHA manually.")
-                    
-                    # Show a message box to the user
-                    self.root.after(0, lambda: messagebox.showinfo(
-                        "CAPTCHA Detected", 
-                        "Please solve the CAPTCHA in the browser window, then click OK to continue."
-                    ))
-                    
-                    # Wait for user to solve CAPTCHA
-                    self.log_message("Waiting for you to solve the CAPTCHA and click OK...")
+                # Create output directory
+                output_path = Path(output_dir)
+                output_path.mkdir(parents=True, exist_ok=True)
+                
+                # Get names of the files already in the output directory
+                initial_files = list_basenames(output_dir)
+                
+                # Check for CAPTCHA
+                self.log_message("Checking for CAPTCHA...")
+                try:
+                    # Look for common CAPTCHA elements, evaluating all the XPaths in the page in one call
+                    captcha_match = self.driver.execute_script(_FIRST_XPATH_MATCH_JS, _CAPTCHA_XPATHS)
                     
-                    # Give some time for the page to load after CAPTCHA is solved
-                    time.sleep(3)
-                    self.log_message("Continuing after CAPTCHA...")
-            except Exception as e:
-                self.log_message(f"Error checking for CAPTCHA: {e}")
-            
-            # Open first image
-            self.log_message("Opening first image...")
-            try:
-                # Try different selectors for the first image
-                first_image_selectors = [
-                    "img[class*='ImagesContentImage-Image_clickable']",
-                    "img[class*='serp-item__thumb']",
-                    ".serp-item__link",
-                    ".serp-item",
-                    "div[class*='serp-item']",
-                    "div[data-grid-position]",
-                    "a[href*='images/search'] img",
-                    "div[class*='Image'] img"
-                ]
+                    if captcha_match is not None:
+                        self.log_message(f"CAPTCHA detected ({captcha_match})! Please solve the CAPTCHA manually.")
+                        
+                        # Show a message box to the user
+                        self.ui_queue.put(("call", lambda: messagebox.showinfo(
+                            "CAPTCHA Detected", 
+                            "Please solve the CAPTCHA in the browser window, then click OK to continue."
+                        )))
+                        
+                        # Wait for user to solve CAPTCHA
+                        self.log_message("Waiting for you to solve the CAPTCHA and click OK...")
+                        
+                        # Give some time for the page to load after CAPTCHA is solved
+                        time.sleep(3)
+                        self.log_message("Continuing after CAPTCHA...")
+                except Exception as e:
+                    self.log_message(f"Error checking for CAPTCHA: {e}")
                 
-                image_found = False
-                for selector in first_image_selectors:
+                # Open first image
+                self.log_message("Opening first image...")
+                try:
+                    # Find the matches for all the first image selectors in one call, then click
+                    # them in order until one works (a match may be hidden or not clickable)
+                    image_found = False
                     try:
-                        self.log_message(f"Trying to find image with selector: {selector}")
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                        if elements:
-                            self.log_message(f"Found {len(elements)} elements with selector: {selector}")
-                            elements[0].click()
+                        matches = self.driver.execute_script(_SELECTOR_MATCHES_JS, _FIRST_IMAGE_SELECTORS)
+                    except Exception as e:
+                        self.log_message(f"Looking for the first image failed: {e}")
+                        matches = []
+                    if not matches:
+                        self.log_message("No first image found with any of the known selectors.")
+                    for selector, element in matches:
+                        try:
+                            self.log_message(f"Found first image with selector: {selector}")
+                            element.click()
                             image_found = True
                             self.log_message("First image opened successfully.")
                             break
-                    except Exception as e:
-                        self.log_message(f"Selector {selector} failed: {e}")
-                
-                if not image_found:
-                    # Try JavaScript click as a last resort
-                    try:
-                        self.log_message("Trying JavaScript click on first image...")
-                        self.driver.execute_script("""
-                            var images = document.querySelectorAll('img');
-                            if (images.length > 0) {
-                                images[0].click();
-                                return true;
-                            }
-                            return false;
-                        """)
-                        time.sleep(2)  # Wait for the click to take effect
-                        image_found = True
-                        self.log_message("First image opened with JavaScript.")
-                    except Exception as e:
-                        self.log_message(f"JavaScript click failed: {e}")
-                
-                if not image_found:
-                    # Show a message box to the user
-                    self.root.after(0, lambda: messagebox.showinfo(
-                        "Manual Interaction Required", 
-                        "Please click on the first image in the browser window, then click OK to continue."
-                    ))
-                    
-                    # Wait for user to click the image
-                    self.log_message("Waiting for you to click on the first image and then click OK...")
-                    
-                    # Give some time for the page to load after user interaction
-                    time.sleep(3)
-                    self.log_message("Continuing after manual interaction...")
-                    image_found = True
-                
-                if not image_found:
-                    raise Exception("Could not open the first image.")
-                
-                # Start downloading images
-                start_time = time.time()
-                consecutive_errors = 0
-                downloaded = 0
-                
-                while not self.stop_event.is_set():
-                    # Check timeout
-                    if timeout > 0 and time.time() - start_time > timeout:
-                        self.log_message(f"Reached timeout of {timeout} seconds.")
-                        break
+                        except Exception as e:
+                            self.log_message(f"Selector {selector} failed: {e}")
                     
-                    # Check if we've downloaded enough images
-                    if count > 0 and downloaded >= count:
-                        self.log_message(f"Downloaded {downloaded} images. Target reached.")
-                        break
+                    if not image_found:
+                        # Try JavaScript click as a last resort
+                        try:
+                            self.log_message("Trying JavaScript click on first image...")
+                            self.driver.execute_script("""
+                                var images = document.querySelectorAll('img');
+                                if (images.length > 0) {
+                                    images[0].click();
+                                    return true;
+                                }
+                                return false;
+                            """)
+                            time.sleep(2)  # Wait for the click to take effect
+                            image_found = True
+                            self.log_message("First image opened with JavaScript.")
+                        except Exception as e:
+                            self.log_message(f"JavaScript click failed: {e}")
                     
-                    try:
-                        # Get image link and size
-                        width_found, height_found = None, None
-                        
-                        # Try to get image size
-                        size_sources = [
-                            "OpenImageButton-SizesButton",
-                            "MMViewerButtons-ImageSizes",
-                            "OpenImageButton-SaveSize",
-                            "Button2-Text",
-                        ]
-                        
-                        for source in size_sources:
-                            if width_found is not None and height_found is not None:
-                                break
-                            for elem in self.driver.find_elements(By.CLASS_NAME, source):
-                                try:
-                                    width_found, height_found = [int(i) for i in elem.text.split("×")]
-                                    break
-                                except:
-                                    pass
+                    if not image_found:
+                        # Show a message box to the user
+                        self.ui_queue.put(("call", lambda: messagebox.showinfo(
+                            "Manual Interaction Required", 
+                            "Please click on the first image in the browser window, then click OK to continue."
+                        )))
                         
-                        if width_found is None or height_found is None:
-                            raise Exception("Could not get image size.")
+                        # Wait for user to click the image
+                        self.log_message("Waiting for you to click on the first image and then click OK...")
                         
-                        # Get image link
-                        link = None
-                        link_sources = [
-                            "OpenImageButton-Save",
-                            "MMViewerButtons-OpenImage",
-                            "MMViewerButtons-Button",
-                            "Button2_link",
-                            "Button2_view_default",
-                        ]
+                        # Give some time for the page to load after user interaction
+                        time.sleep(3)
+                        self.log_message("Continuing after manual interaction...")
+                        image_found = True
+                    
+                    if not image_found:
+                        raise Exception("Could not open the first image.")
+                    
+                    # Start downloading images
+                    start_time = time.time()
+                    consecutive_errors = 0
+                    
+                    while not self.stop_event.is_set():
+                        # Check timeout
+                        if timeout > 0 and time.time() - start_time > timeout:
+                            self.log_message(f"Reached timeout of {timeout} seconds.")
+                            break
                         
-                        blacklist = [
-                            "yandex-images",
-                            "avatars.mds.yandex.net",
-                        ]
+                        # Check if we've downloaded enough images
+                        if count > 0 and self.downloaded_count >= count:
+                            self.log_message(f"Downloaded {self.downloaded_count} images. Target reached.")
+                            break
                         
-                        for source in link_sources:
-                            if link is not None:
-                                break
-                            for elem in self.driver.find_elements(By.CLASS_NAME, source):
-                                try:
-                                    link = elem.get_attribute("href")
-                                    for b in blacklist:
-                                        if b in link:
-                                            time.sleep(2)
-                                            link = elem.get_attribute("href")
-                                            break
+                        try:
+                            # Get image size and link in a single round-trip to the browser
+                            found = self.driver.execute_script(_FIND_IMAGE_JS, _SIZE_SOURCES, _LINK_SOURCES, _BLACKLIST)
+                            for text in found["sizes"]:
+                                match = _SIZE_RE.fullmatch(text)
+                                if match:
+                                    width_found, height_found = int(match.group(1)), int(match.group(2))
                                     break
-                                except:
-                                    pass
-                        
-                        if link is None:
-                            raise Exception("Could not get image link.")
-                        
-                        # Check if image meets size requirements
-                        if width_found >= width and height_found >= height:
-                            self.log_message(f"Found image: {width_found}x{height_found} - {link}")
+                            else:
+                                raise Exception("Could not get image size.")
+                            
+                            link = found["link"]
+                            if link is not None and found["blacklisted"]:
+                                # The viewer sometimes only fills in the real link a moment later
+                                time.sleep(2)
+                                link = self.driver.execute_script(_FIND_IMAGE_JS, _SIZE_SOURCES, _LINK_SOURCES, _BLACKLIST)["link"]
+                            
+                            if link is None:
+                                raise Exception("Could not get image link.")
+                            
+                            # Check if image meets size requirements, and hand it to the download pool;
+                            # the browser moves on to the next image without waiting for it
+                            if width_found >= width and height_found >= height:
+                                self.log_message(f"Found image: {width_found}x{height_found} - {link}")
+                                future = executor.submit(
+                                    self._download_one, link, session, width, height, count, output_path, initial_files
+                                )
+                                pending.add(future)
+                                future.add_done_callback(pending.discard)
                             
-                            # Download image
+                            # Move to next image
                             try:
-                                import requests
-                                from PIL import Image
-                                import io
-                                import hashlib
-                                import numpy as np
-                                
-                                headers = {
-                                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0",
-                                    "Referer": "https://yandex.com/",
-                                }
-                                
-                                response = requests.get(link, headers=headers, verify=False, timeout=10)
-                                
-                                if 200 <= response.status_code < 300:
-                                    img = Image.open(io.BytesIO(response.content))
-                                    img_width, img_height = img.size
-                                    
-                                    if img_width >= width and img_height >= height:
-                                        hash_name = hashlib.sha256(np.array(img)).hexdigest()
-                                        img_path = output_path / (hash_name + ".png")
-                                        
-                                        if hash_name not in initial_files and not img_path.exists():
-                                            img = img.convert("RGB")
-                                            img.save(img_path, "PNG")
-                                            downloaded += 1
-                                            self.log_message(f"Downloaded image {downloaded}: {img_width}x{img_height}")
-                                            consecutive_errors = 0
+                                btn = self.driver.find_element(
+                                    By.CSS_SELECTOR, "button[class*='CircleButton_type_next']"
+                                )
+                                btn.click()
+                                time.sleep(1)  # Wait for the next image to load
                             except Exception as e:
-                                self.log_message(f"Error downloading image: {e}")
-                        
-                        # Move to next image
-                        try:
-                            btn = self.driver.find_element(
-                                By.CSS_SELECTOR, "button[class*='CircleButton_type_next']"
-                            )
-                            btn.click()
-                            time.sleep(1)  # Wait for the next image to load
+                                raise Exception(f"Could not move to the next image: {e}")
+                            
+                            consecutive_errors = 0
+                            
                         except Exception as e:
-                            raise Exception(f"Could not move to the next image: {e}")
-                        
-                    except Exception as e:
-                        consecutive_errors += 1
-                        self.log_message(f"Error: {e}")
-                        
-                        if consecutive_errors >= max_errors:
-                            self.log_message(f"Reached maximum consecutive errors ({max_errors}). Stopping.")
-                            break
-                        
-                        time.sleep(2)  # Wait before retrying
-                
-                elapsed_time = time.time() - start_time
-                self.log_message(f"Download complete. Downloaded {downloaded} images in {elapsed_time:.1f} seconds.")
-                
-            except Exception as e:
-                self.log_message(f"Error during download: {e}")
+                            consecutive_errors += 1
+                            self.log_message(f"Error: {e}")
+                            
+                            if consecutive_errors >= max_errors:
+                                self.log_message(f"Reached maximum consecutive errors ({max_errors}). Stopping.")
+                                break
+                            
+                            time.sleep(2)  # Wait before retrying
+                    
+                except Exception as e:
+                    self.log_message(f"Error during download: {e}")
             
-            finally:
-                # Clean up
-                if self.driver:
-                    self.driver.quit()
-                    self.driver = None
+            # The browser is back in the pool; now let the downloads already in flight finish
+            # (or, after Stop, drop the queued ones) before reporting
+            self.driver = None
+            if self.stop_event.is_set():
+                _cancel_pending(pending)
+            executor.shutdown(wait=True)
+            if start_time is not None:
+                elapsed_time = time.time() - start_time
+                self.log_message(f"Download complete. Downloaded {self.downloaded_count} images in {elapsed_time:.1f} seconds.")
         
         except Exception as e:
             self.log_message(f"Error: {e}")
         
         finally:
-            # Update UI
+            self.driver = None
+            _cancel_pending(pending)
+            executor.shutdown(wait=True)
+            session.close()
+            
+            # Update UI, only now that neither this thread nor its workers touch anything any more
+            if self.stop_event.is_set():
+                self.log_message("Download stopped.")
             self.is_downloading = False
-            self.root.after(0, lambda: self.start_button.config(state=tk.NORMAL))
-            self.root.after(0, lambda: self.stop_button.config(state=tk.DISABLED))
+            self.ui_queue.put(("call", lambda: self.start_button.config(state=tk.NORMAL)))
+            self.ui_queue.put(("call", lambda: self.stop_button.config(state=tk.DISABLED)))
 
-def on_closing(root):
-    if messagebox.askokcancel("Quit", "Do you want to quit?"):
-        # Clean up any resources
-        root.destroy()
-        sys.exit(0)
+def on_closing(app, confirm=True):
+    """
+    Stop any running download, release the browser and close the window.
+    
+    Args:
+        app: The running YandexCrawlerGUI
+        confirm: Whether to ask the user first
+    """
+    if confirm and not messagebox.askokcancel("Quit", "Do you want to quit?"):
+        return
+    
+    # Let the download thread wind down before its browser goes away
+    app.stop_event.set()
+    if app.download_thread and app.download_thread.is_alive():
+        app.download_thread.join(timeout=5.0)
+        if app.download_thread.is_alive():
+            browser_pool.kill()
+    
+    # Clean up any resources
+    browser_pool.drain()
+    try:
+        app.root.destroy()
+    except tk.TclError:
+        pass  # Already closed, e.g. by a second signal
 
 def main():
     root = tk.Tk()
     app = YandexCrawlerGUI(root)
-    root.protocol("WM_DELETE_WINDOW", lambda: on_closing(root))
-    root.mainloop()
+    root.protocol("WM_DELETE_WINDOW", lambda: on_closing(app))
+    
+    # Shut down the same way as closing the window; the handler only runs once Tk hands control
+    # back to Python, which the UI pump does every UI_PUMP_INTERVAL ms
+    def shutdown(signum, frame):
+        app.stop_event.set()
+        root.after(0, lambda: on_closing(app, confirm=False))
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    
+    try:
+        root.mainloop()
+    finally:
+        # In case mainloop ends without going through on_closing
+        browser_pool.drain()
 
 if __name__ == "__main__":
     main()